@@ -4,26 +4,102 @@
 #     'requests',
 #     'sqlalchemy',
 #     'psycopg2-binary',
+#     'rtoml',
+#     'orjson',
 # ]
 # ///
 
 import argparse
+import atexit
+import copy
+import csv
+import functools
+import io
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import re
 import sys
+import time
 import tomllib
+import warnings
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 from typing import Any, Optional
 
-import requests
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import SQLAlchemyError
+# SQLAlchemy and Requests are imported by the functions that use them.
+# Importing them takes longer than anything else that db_fwd does
+# before it connects to a database, and it is not needed for "--help"
+# or for invalid arguments.
+
+# rtoml parses TOML several times faster than the standard library, but
+# is optional so that db_fwd still runs where it is not installed.
+# Files are read whole before they are parsed, which is faster than
+# parsing from a stream.
+try:
+    import rtoml
+
+    def load_toml(path: Path) -> dict[str, Any]:
+        return rtoml.loads(path.read_text(encoding='utf-8'))
+
+except ImportError:
+
+    def load_toml(path: Path) -> dict[str, Any]:
+        return tomllib.loads(path.read_text(encoding='utf-8'))
+
+
+def _json_default(obj):
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    return str(obj)
+
+
+# orjson serializes JSON several times faster than the standard library,
+# but is optional so that db_fwd still runs where it is not installed.
+# Values that JSON does not support, like Decimals, are serialized as
+# strings by both.
+try:
+    import orjson
+
+    def dump_json(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_json_default)
+
+except ImportError:
+
+    def dump_json(obj: Any) -> bytes:
+        return json.dumps(obj, default=_json_default).encode()
+
+
+def iter_rows_json(rows: Iterable[Any]) -> Iterator[bytes]:
+    """
+    Yields ``rows`` as a JSON object, one row at a time, so that large
+    results can be streamed without building the whole document.
+
+    >>> b''.join(iter_rows_json([{'a': 1}, {'a': 2}]))
+    b'{"rows":[{"a":1},{"a":2}]}'
+    >>> b''.join(iter_rows_json([]))
+    b'{"rows":[]}'
+    """
+    yield b'{"rows":['
+    for i, row in enumerate(rows):
+        if i:
+            yield b','
+        yield dump_json(row)
+    yield b']}'
+
 
 type UsernameType = str
 type PasswordType = str
 type CredentialsType = tuple[UsernameType, PasswordType]
 
 
+# Parsed config files, keyed by path, modification time and size, so
+# that an unchanged file is only parsed once
+_config_cache: dict[tuple[str, int, int], dict[str, Any]] = {}
+
+
 class Config:
     """Configuration manager for db_fwd."""
 
@@ -39,32 +115,50 @@ class Config:
                 f'Configuration file not found: {self.config_file}'
             )
 
-        with open(config_path, 'rb') as f:
-            self.config = tomllib.load(f)
-
-    def _get_db_fwd(self):
-        return self.config.get('db_fwd', {})
+        stat = config_path.stat()
+        key = (str(config_path.resolve()), stat.st_mtime_ns, stat.st_size)
+        if key not in _config_cache:
+            _config_cache[key] = load_toml(config_path)
+        self.config = copy.deepcopy(_config_cache[key])
+
+        # Resolve sections once so that getters don't repeatedly walk
+        # the config
+        self._db_fwd = self.config.get('db_fwd', {})
+        self._queries = self.config.get('queries', {})
+        self._query_configs = {
+            name: value
+            for name, value in self._queries.items()
+            if isinstance(value, dict)
+        }
+        # Only credentials from the file are resolved here. The
+        # environment can change while the config is cached, so it is
+        # read when credentials are requested.
+        self._api_credentials = {
+            name: self._get_file_api_credentials(query_config)
+            for name, query_config in self._query_configs.items()
+        }
+        self._default_api_credentials = self._get_file_api_credentials({})
+
+    def _get_query_config(self, query_name):
+        return self._query_configs.get(query_name, {})
 
     def get_log_level(self):
-        return self._get_db_fwd().get('log_level', 'info')
+        return self._db_fwd.get('log_level', 'info')
 
     def get_log_file(self):
-        return self._get_db_fwd().get('log_file', 'db_fwd.log')
+        return self._db_fwd.get('log_file', 'db_fwd.log')
 
     def get_log_db_url(self) -> str | None:
-        log_db_url: str | None = self._get_db_fwd().get('log_db_url')
+        log_db_url: str | None = self._db_fwd.get('log_db_url')
         return log_db_url
 
     def get_db_url(self, query_name=None):
-        # Check query-specific db_url first
-        if query_name and 'queries' in self.config:
-            query_config = self.config['queries'].get(query_name, {})
-            if 'db_url' in query_config:
-                return query_config['db_url']
+        query_config = self._get_query_config(query_name)
+        if 'db_url' in query_config:
+            return query_config['db_url']
 
-        # Check queries section db_url
-        if 'queries' in self.config and 'db_url' in self.config['queries']:
-            return self.config['queries']['db_url']
+        if 'db_url' in self._queries:
+            return self._queries['db_url']
 
         # Fall back to environment variable
         db_url = os.environ.get('DB_FWD_DB_URL')
@@ -73,52 +167,37 @@ class Config:
         return db_url
 
     def get_query(self, query_name):
-        if (
-            'queries' not in self.config
-            or query_name not in self.config['queries']
-        ):
+        try:
+            query_config = self._query_configs[query_name]
+        except KeyError:
             raise ValueError(
                 f"Query '{query_name}' not found in configuration"
-            )
+            ) from None
 
-        query_config = self.config['queries'][query_name]
-        if 'query' not in query_config:
-            raise ValueError(f"No query defined for '{query_name}'")
-
-        return query_config['query']
+        try:
+            return query_config['query']
+        except KeyError:
+            raise ValueError(f"No query defined for '{query_name}'") from None
 
     def get_api_url(self, query_name):
-        # Check query-specific api_url
-        if 'queries' in self.config and query_name in self.config['queries']:
-            query_config = self.config['queries'][query_name]
-            if 'api_url' in query_config:
-                return query_config['api_url']
+        query_config = self._get_query_config(query_name)
+        if 'api_url' in query_config:
+            return query_config['api_url']
 
-        # Check queries section api_url
-        if 'queries' in self.config and 'api_url' in self.config['queries']:
-            return self.config['queries']['api_url']
+        if 'api_url' in self._queries:
+            return self._queries['api_url']
 
         raise ValueError(f"API URL not configured for query '{query_name}'")
 
+    def get_batch(self, query_name):
+        return self._get_query_config(query_name).get('batch', False)
+
     def get_api_credentials(
         self, query_name: Optional[str] = None
     ) -> CredentialsType | None:
-        username = password = None
-
-        # Check query-specific credentials
-        if (
-            query_name
-            and 'queries' in self.config
-            and query_name in self.config['queries']
-        ):
-            query_config = self.config['queries'][query_name]
-            username = query_config.get('api_username')
-            password = query_config.get('api_password')
-
-        # Fall back to queries section credentials
-        if not username and 'queries' in self.config:
-            username = self.config['queries'].get('api_username')
-            password = self.config['queries'].get('api_password')
+        username, password = self._api_credentials.get(
+            query_name, self._default_api_credentials
+        )
 
         # Fall back to environment variables
         if not username:
@@ -128,18 +207,124 @@ class Config:
 
         return (username, password) if username and password else None
 
+    def _get_file_api_credentials(
+        self, query_config: dict[str, Any]
+    ) -> tuple[str | None, str | None]:
+        # Check query-specific credentials
+        username = query_config.get('api_username')
+        password = query_config.get('api_password')
 
-class DatabaseHandler(logging.Handler):
-    """Logging handler that writes to a database table."""
+        # Fall back to queries section credentials
+        if not username:
+            username = self._queries.get('api_username')
+            password = self._queries.get('api_password')
+
+        return username, password
+
+
+@functools.lru_cache(maxsize=8)
+def _get_engine(db_url):
+    from sqlalchemy import create_engine
+
+    # Engines are shared by URL so that their connection pools are
+    # reused by every query and log record in the process. A run is
+    # short-lived, so pooled connections are not pinged on checkout;
+    # that would cost a round trip for every batch of log records.
+    return create_engine(
+        db_url,
+        pool_use_lifo=True,
+        pool_recycle=1800,
+    )
+
+
+# The (log database URL, table name) pairs whose log table has already
+# been created by this process
+_created_log_tables: set[tuple[str, str]] = set()
+
+
+# The temporary table that DatabaseHandler copies large batches into
+COPY_TABLE_NAME = 'db_fwd_logs_copy'
+
+
+class DatabaseHandler(logging.handlers.BufferingHandler):
+    """
+    Logging handler that writes to a database table.
+
+    Records are buffered and inserted in batches, when the buffer is
+    full, when ``flush_interval`` seconds have passed since the last
+    batch, or when the handler is flushed or closed.
+
+    ``table_name`` is used in SQL as given, and must be a valid
+    identifier.
+    """
 
-    def __init__(self, db_url: str):
-        super().__init__()
-        self.engine = create_engine(db_url)
+    # Batches of at least this many records are written with COPY when
+    # the driver is psycopg2. COPY streams the rows without parsing a
+    # statement for each one, but costs more than an INSERT for a few.
+    # The default capacity is the same, so that a full buffer is copied,
+    # and smaller batches flushed on time are inserted.
+    copy_threshold = 500
+
+    def __init__(
+        self,
+        db_url: str,
+        capacity=500,
+        flush_interval=1.0,
+        table_name='db_fwd_logs',
+    ):
+        from sqlalchemy import text
+
+        super().__init__(capacity)
+        self.db_url = db_url
+        self.table_name = table_name
+        self.engine = _get_engine(db_url)
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._conn: Any = None
         self._ensure_table()
 
+        # Records are written in batches, so their timestamps are set
+        # from the records instead of defaulting to the time of insert.
+        # They are sent as Unix times for PostgreSQL to convert, so that
+        # they are in the session's time zone, like CURRENT_TIMESTAMP.
+        self._insert_sql = text(
+            f"""
+            INSERT INTO {table_name} (timestamp, level, message)
+            VALUES (to_timestamp(:created), :level, :message)
+            """
+        )
+        # COPY cannot convert values, so it fills a temporary table that
+        # the rows are then inserted from.
+        self._copy_sql = (
+            f'COPY {COPY_TABLE_NAME} (created, level, message) '
+            'FROM STDIN WITH (FORMAT csv)'
+        )
+        self._insert_copied_sql = f"""
+            INSERT INTO {table_name} (timestamp, level, message)
+            SELECT to_timestamp(created), level, message
+            FROM {COPY_TABLE_NAME}
+            """
+
+    def _get_connection(self):
+        # Batches are written on one connection that is held open,
+        # instead of checking a connection out of the pool for each one.
+        if self._conn is None:
+            self._conn = self.engine.connect()
+        return self._conn
+
+    def _close_connection(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
     def _ensure_table(self):
-        create_table_sql = """
-        CREATE TABLE IF NOT EXISTS db_fwd_logs (
+        from sqlalchemy import text
+
+        if (self.db_url, self.table_name) in _created_log_tables:
+            return
+
+        create_table_sql = f"""
+        CREATE TABLE IF NOT EXISTS {self.table_name} (
             id SERIAL PRIMARY KEY,
             timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             level VARCHAR(10),
@@ -147,87 +332,349 @@ class DatabaseHandler(logging.Handler):
         )
         """
 
-        with self.engine.connect() as conn:
-            conn.execute(text(create_table_sql))
-            conn.commit()
+        conn = self._get_connection()
+        conn.execute(text(create_table_sql))
+        conn.commit()
+        _created_log_tables.add((self.db_url, self.table_name))
 
-    def emit(self, record):
-        insert_sql = """
-        INSERT INTO db_fwd_logs (level, message)
-        VALUES (:level, :message)
-        """
+    def shouldFlush(self, record):
+        return (
+            super().shouldFlush(record)
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        )
 
+    def flush(self):
+        from sqlalchemy.exc import SQLAlchemyError
+
+        self.acquire()
         try:
-            with self.engine.connect() as conn:
-                conn.execute(
-                    text(insert_sql),
-                    {'level': record.levelname, 'message': self.format(record)},
-                )
-                conn.commit()
-        except SQLAlchemyError:
+            if not self.buffer:
+                return
+            rows = [
+                {
+                    'created': record.created,
+                    'level': record.levelname,
+                    'message': self.format(record),
+                }
+                for record in self.buffer
+            ]
+            try:
+                conn = self._get_connection()
+                if (
+                    len(rows) >= self.copy_threshold
+                    and self.engine.dialect.driver == 'psycopg2'
+                ):
+                    self._copy_rows(conn, rows)
+                else:
+                    conn.execute(self._insert_sql, rows)
+                    conn.commit()
+            except SQLAlchemyError:
+                self.handleError(self.buffer[-1])
+                # Reconnect for the next batch, in case the connection
+                # was lost
+                self._close_connection()
+            finally:
+                self.buffer.clear()
+                self._last_flush = time.monotonic()
+        finally:
+            self.release()
+
+    def _copy_rows(self, conn, rows):
+        from sqlalchemy.exc import DBAPIError
+
+        # Every field is quoted, because COPY reads an unquoted empty
+        # field as NULL instead of as an empty message.
+        data = io.StringIO()
+        csv.writer(data, quoting=csv.QUOTE_ALL).writerows(
+            (repr(row['created']), row['level'], row['message'])
+            for row in rows
+        )
+        data.seek(0)
+
+        dbapi = conn.dialect.loaded_dbapi
+        dbapi_conn = conn.connection
+        cursor = dbapi_conn.cursor()
+        try:
+            # Pooled connections can outlive a handler, and keep the
+            # temporary table from an earlier one.
+            cursor.execute(
+                f"""
+                CREATE TEMPORARY TABLE IF NOT EXISTS {COPY_TABLE_NAME} (
+                    created DOUBLE PRECISION,
+                    level VARCHAR(10),
+                    message TEXT
+                ) ON COMMIT DELETE ROWS
+                """
+            )
+            cursor.copy_expert(self._copy_sql, data)
+            cursor.execute(self._insert_copied_sql)
+            # SQLAlchemy has not begun a transaction on the connection,
+            # so its commit() would not commit the one psycopg2 began.
+            dbapi_conn.commit()
+        except dbapi.Error as e:
+            # The transaction is rolled back when flush() returns the
+            # connection to the pool, which also copes with a connection
+            # that has been lost.
+            raise DBAPIError.instance(
+                self._copy_sql, None, e, dbapi.Error, dialect=conn.dialect
+            ) from e
+        finally:
+            cursor.close()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._close_connection()
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    File handler that opens its file on first use, and leaves flushing
+    to the file's write buffer, instead of flushing every record.
+    """
+
+    buffer_size = 64 * 1024
+
+    def __init__(self, filename):
+        super().__init__(filename, delay=True)
+
+    def _open(self):
+        return open(
+            self.baseFilename,
+            self.mode,
+            buffering=self.buffer_size,
+            encoding=self.encoding,
+            errors=self.errors,
+        )
+
+    def emit(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except RecursionError:
+            raise
+        except Exception:
             self.handleError(record)
 
 
+LOG_FORMATTER = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
+
+def _close_handlers(logger):
+    for handler in logger.handlers[:]:
+        # A queue handler's listener is stopped first, so that the
+        # records still in its queue reach its handlers before they close.
+        listener = getattr(handler, 'listener', None)
+        if listener is not None:
+            listener.stop()
+            for listener_handler in listener.handlers:
+                listener_handler.close()
+        handler.close()
+        logger.removeHandler(handler)
+
+
 def set_up_logging(log_level_name, log_filename, log_db_url: Optional[str]):
-    if log_level_name.lower() == 'none':
-        log_level = logging.CRITICAL + 1
-    else:
-        name_to_level = logging.getLevelNamesMapping()
-        if log_level_name.upper() not in name_to_level:
-            raise ValueError(f'Invalid log level {log_level_name!r}')
-        log_level = name_to_level[log_level_name.upper()]
     logger = logging.getLogger()
-    logger.setLevel(log_level)
-    logger.handlers.clear()
-
-    file_handler = logging.FileHandler(log_filename)
-    file_handler.setFormatter(
-        logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    )
+    if log_level_name.lower() == 'none':
+        # Disabling logging drops records before any handler is called,
+        # so no handlers are needed, and no log file is opened.
+        _close_handlers(logger)
+        logging.disable(logging.CRITICAL)
+        return
+
+    name_to_level = logging.getLevelNamesMapping()
+    if log_level_name.upper() not in name_to_level:
+        raise ValueError(f'Invalid log level {log_level_name!r}')
+    logging.disable(logging.NOTSET)
+    logger.setLevel(name_to_level[log_level_name.upper()])
+    _close_handlers(logger)
+
+    file_handler = BufferedFileHandler(log_filename)
+    file_handler.setFormatter(LOG_FORMATTER)
     logger.addHandler(file_handler)
 
     if log_db_url:
-        db_handler = DatabaseHandler(log_db_url)
-        logger.addHandler(db_handler)
+        # Database writes happen on the listener's thread so that logging
+        # does not wait on a round trip to the database.
+        log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.listener = logging.handlers.QueueListener(
+            log_queue,
+            DatabaseHandler(log_db_url),
+            respect_handler_level=True,
+        )
+        queue_handler.listener.start()
+        atexit.register(queue_handler.listener.stop)
+        logger.addHandler(queue_handler)
+
+
+# Matches the :param1, :param2, etc. placeholders that execute_query()
+# binds, but not PostgreSQL casts like "data::text".
+QUERY_PARAM_RE = re.compile(r'(?<![:\w]):param([1-9]\d*)\b')
+
 
+def _get_stmt_cache_size(default=256):
+    # This runs on import, so an invalid value falls back to the default
+    # instead of stopping db_fwd before it can even show "--help".
+    value = os.environ.get('DB_FWD_STMT_CACHE_SIZE', str(default))
+    try:
+        size = int(value)
+    except ValueError:
+        size = -1
+    if size < 0:
+        warnings.warn(
+            f'Invalid DB_FWD_STMT_CACHE_SIZE {value!r}, using {default}',
+            stacklevel=2,
+        )
+        return default
+    return size
+
+
+# The number of query strings whose converted and compiled statements
+# are kept for reuse
+STMT_CACHE_SIZE = _get_stmt_cache_size()
+
+
+@functools.lru_cache(maxsize=STMT_CACHE_SIZE)
+def to_positional(query):
+    """
+    Converts the placeholders in ``query`` to psycopg2's positional
+    "format" paramstyle, and escapes literal percent signs. Returns the
+    converted query, and the index of the parameter to bind to each
+    placeholder in turn.
+
+    >>> to_positional("SELECT data::text FROM t WHERE a = :param1;")
+    ('SELECT data::text FROM t WHERE a = %s;', (0,))
+    >>> to_positional("SELECT data FROM t WHERE a LIKE '5%' AND b = :param1;")
+    ("SELECT data FROM t WHERE a LIKE '5%%' AND b = %s;", (0,))
+    >>> to_positional("SELECT :param2, :param1, :param2;")
+    ('SELECT %s, %s, %s;', (1, 0, 1))
+    """
+    indexes = []
 
-def execute_query(db_url, query, params):
+    def replace(match):
+        indexes.append(int(match[1]) - 1)
+        return '%s'
+
+    positional_query = QUERY_PARAM_RE.sub(replace, query.replace('%', '%%'))
+    return positional_query, tuple(indexes)
+
+
+@functools.lru_cache(maxsize=STMT_CACHE_SIZE)
+def _compile_query(query):
+    from sqlalchemy import text
+
+    return text(query)
+
+
+def _fetch_with_psycopg2(conn, query, params, batch):
+    from sqlalchemy.exc import DBAPIError
+
+    # Using the psycopg2 cursor directly skips SQLAlchemy Core's
+    # statement compilation and Row processing, which are pure overhead
+    # when fetching a single value. Binding positionally also skips
+    # building and looking up a dict of named parameters.
+    positional_query, indexes = to_positional(query)
+    try:
+        args = tuple(params[i] for i in indexes)
+    except IndexError:
+        raise ValueError('Query has more parameters than were given') from None
+
+    dbapi = conn.dialect.loaded_dbapi
+    cursor = conn.connection.cursor()
+    try:
+        # psycopg2 only unescapes "%%" when it is given parameters
+        if indexes:
+            cursor.execute(positional_query, args)
+        else:
+            cursor.execute(query)
+        if cursor.description is None:
+            raise ValueError('Query returned no results')
+        columns = [column.name for column in cursor.description]
+        rows = cursor.fetchall() if batch else cursor.fetchmany(2)
+    except dbapi.Error as e:
+        raise DBAPIError.instance(
+            query, args, e, dbapi.Error, dialect=conn.dialect
+        ) from e
+    finally:
+        cursor.close()
+    return columns, rows
+
+
+def execute_query(db_url, query, params, batch=False):
     """Execute SQL query and return the result using parameterized queries.
 
     Query parameters should use named placeholders like :param1, :param2, etc.
     or positional placeholders that SQLAlchemy supports.
+
+    Returns the only field of the only row that the query returns. If
+    ``batch`` is True, returns all the rows instead, as a list of dicts.
     """
-    engine = create_engine(db_url)
+    from sqlalchemy.exc import SQLAlchemyError
+
+    engine = _get_engine(db_url)
 
     # Assumes parameters are named :param1, :param2, etc. in the query
-    if params:
-        param_dict = {f'param{i+1}': param for i, param in enumerate(params)}
-    else:
-        param_dict = {}
+    param_dict = {f'param{i}': param for i, param in enumerate(params, 1)}
 
-    logging.info(f'Executing query: {query}')
-    logging.debug(f'Query parameters: {param_dict}')
+    logging.info('Executing query: %s', query)
+    logging.debug('Query parameters: %s', param_dict)
 
+    # Autocommit saves the round trips to begin a transaction and to
+    # roll it back when the connection is returned to the pool.
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text(query), param_dict)
-            rows = result.fetchmany(2)
+        with engine.connect().execution_options(
+            isolation_level='AUTOCOMMIT'
+        ) as conn:
+            if engine.dialect.driver == 'psycopg2':
+                columns, rows = _fetch_with_psycopg2(
+                    conn, query, params, batch
+                )
+            else:
+                result = conn.execute(_compile_query(query), param_dict)
+                columns = list(result.keys())
+                rows = result.fetchall() if batch else result.fetchmany(2)
+    except SQLAlchemyError as e:
+        logging.error('Database error: %s', e)
+        raise
 
-            if not rows:
-                raise ValueError('Query returned no results')
+    # A batch query can legitimately find nothing to report, and its
+    # empty list of rows is forwarded like any other.
+    if batch:
+        return [dict(zip(columns, row)) for row in rows]
 
-            if len(rows) > 1:
-                raise ValueError('Query returned more than one row')
+    if not rows:
+        raise ValueError('Query returned no results')
 
-            row = rows[0]
+    if len(rows) > 1:
+        raise ValueError('Query returned more than one row')
 
-            if len(row) != 1:
-                raise ValueError('Query must return exactly one field')
+    if len(columns) != 1:
+        raise ValueError('Query must return exactly one field')
 
-            return row[0]
-    except SQLAlchemyError as e:
-        logging.error(f'Database error: {e}')
-        raise
+    return rows[0][0]
+
+
+@functools.cache
+def _get_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import Retry
+
+    # urllib3 does not retry POST requests after they have been sent, so
+    # these retries only apply to failures to connect.
+    retries = Retry(total=3, backoff_factor=0.2)
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=retries,
+    )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
 
 def forward_to_api(
@@ -235,24 +682,47 @@ def forward_to_api(
     payload: Any,
     credentials: Optional[CredentialsType],
 ) -> None:
-    logging.info(f'Forwarding to API: {api_url}')
-    logging.debug(f'API Request - URL: {api_url}, Payload: {payload}')
+    logging.info('Forwarding to API: %s', api_url)
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        # A streamed batch can only be read once, when it is sent
+        logged_payload = payload
+        if isinstance(payload, Iterator):
+            logged_payload = '<streamed batch>'
+        elif isinstance(payload, bytes):
+            logged_payload = payload.decode('utf-8', errors='replace')
+        logging.debug(
+            'API Request - URL: %s, Payload: %s', api_url, logged_payload
+        )
 
-    response = requests.post(
+    # Iterators of bytes, like iter_rows_json(), are streamed with
+    # chunked transfer encoding
+    data: bytes | Iterator[bytes]
+    if isinstance(payload, Iterator):
+        data = payload
+    else:
+        data = dump_json(payload)
+    # (connect, read) timeouts. Large imports can take minutes to
+    # process, so the read timeout is generous.
+    response = _get_session().post(
         api_url,
-        json=payload,
+        data=data,
         auth=credentials,
         headers={'Content-Type': 'application/json'},
+        timeout=(5, 300),
     )
-    logging.info(f'API Response - Status: {response.status_code}')
-    logging.debug(
-        f'API Response - Status: {response.status_code}, '
-        f'Body: {response.text}'
-    )
+    logging.info('API Response - Status: %s', response.status_code)
+    # Decoding the response body is only worth it if it will be logged
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug(
+            'API Response - Status: %s, Body: %s',
+            response.status_code,
+            response.text,
+        )
     response.raise_for_status()
 
 
-def parse_args() -> argparse.Namespace:
+@functools.cache
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description='Forwards a SQL query result to a web API endpoint.'
     )
@@ -273,11 +743,15 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         'query_params', nargs='*', help='Parameters for the query'
     )
+    return parser
 
-    return parser.parse_args()
+
+def parse_args() -> argparse.Namespace:
+    return _build_parser().parse_args()
 
 
 def main():
+    start = time.perf_counter()
     args = parse_args()
 
     try:
@@ -288,22 +762,26 @@ def main():
         log_db_url = config.get_log_db_url()
         set_up_logging(log_level, log_file, log_db_url)
 
-        logging.info(f'Starting db_fwd for query: {args.query_name}')
-
         db_url = config.get_db_url(args.query_name)
         query = config.get_query(args.query_name)
         api_url = config.get_api_url(args.query_name)
         creds = config.get_api_credentials(args.query_name)
+        batch = config.get_batch(args.query_name)
 
-        result = execute_query(db_url, query, args.query_params)
-        logging.debug(f'Query result: {result}')
+        result = execute_query(db_url, query, args.query_params, batch)
+        logging.debug('Query result: %s', result)
 
-        forward_to_api(api_url, result, creds)
+        payload = iter_rows_json(result) if batch else result
+        forward_to_api(api_url, payload, creds)
 
-        logging.info('Completed successfully')
+        logging.info(
+            'Completed query %s in %d ms',
+            args.query_name,
+            (time.perf_counter() - start) * 1000,
+        )
 
     except Exception as e:
-        logging.error(f'Error: {e}')
+        logging.error('Error running query %s: %s', args.query_name, e)
         sys.exit(1)
 
 
@@ -1,15 +1,29 @@
 """Tests for API operations."""
 
+import json
 import logging
+from datetime import date
+from decimal import Decimal
+
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import ANY, Mock, patch
 import requests
+from requests.adapters import HTTPAdapter
 from unmagic import get_request
 
-from db_fwd import forward_to_api
+from db_fwd import _get_session, forward_to_api, iter_rows_json
+
+
+def test_session_is_reused():
+    session = _get_session()
 
+    assert _get_session() is session
+    adapter = session.get_adapter('https://example.com/api')
+    assert isinstance(adapter, HTTPAdapter)
+    assert adapter.max_retries.total == 3
 
-@patch('db_fwd.requests.post')
+
+@patch('requests.Session.post')
 def test_forward_to_api_success(mock_post):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -21,14 +35,16 @@ def test_forward_to_api_success(mock_post):
 
     mock_post.assert_called_once_with(
         'https://example.com/api',
-        json=payload,
+        data=ANY,
         auth=('user', 'pass'),
         headers={'Content-Type': 'application/json'},
+        timeout=(5, 300),
     )
+    assert json.loads(mock_post.call_args[1]['data']) == payload
     mock_response.raise_for_status.assert_called_once()
 
 
-@patch('db_fwd.requests.post')
+@patch('requests.Session.post')
 def test_forward_to_api_no_auth(mock_post):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -40,13 +56,15 @@ def test_forward_to_api_no_auth(mock_post):
 
     mock_post.assert_called_once_with(
         'https://example.com/api',
-        json=payload,
+        data=ANY,
         auth=None,
         headers={'Content-Type': 'application/json'},
+        timeout=(5, 300),
     )
+    assert json.loads(mock_post.call_args[1]['data']) == payload
 
 
-@patch('db_fwd.requests.post')
+@patch('requests.Session.post')
 def test_forward_to_api_http_error(mock_post):
     mock_response = Mock()
     mock_response.status_code = 500
@@ -62,7 +80,7 @@ def test_forward_to_api_http_error(mock_post):
         forward_to_api('https://example.com/api', payload, ('user', 'pass'))
 
 
-@patch('db_fwd.requests.post')
+@patch('requests.Session.post')
 def test_forward_to_api_connection_error(mock_post):
     mock_post.side_effect = requests.exceptions.ConnectionError(
         'Connection refused'
@@ -74,7 +92,7 @@ def test_forward_to_api_connection_error(mock_post):
         forward_to_api('https://example.com/api', payload, ('user', 'pass'))
 
 
-@patch('db_fwd.requests.post')
+@patch('requests.Session.post')
 def test_forward_to_api_timeout(mock_post):
     mock_post.side_effect = requests.exceptions.Timeout('Request timed out')
 
@@ -84,7 +102,7 @@ def test_forward_to_api_timeout(mock_post):
         forward_to_api('https://example.com/api', payload, ('user', 'pass'))
 
 
-@patch('db_fwd.requests.post')
+@patch('requests.Session.post')
 def test_forward_to_api_json_payload(mock_post):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -96,10 +114,10 @@ def test_forward_to_api_json_payload(mock_post):
     forward_to_api('https://example.com/api', payload, ('user', 'pass'))
 
     call_kwargs = mock_post.call_args[1]
-    assert call_kwargs['json'] == payload
+    assert json.loads(call_kwargs['data']) == payload
 
 
-@patch('db_fwd.requests.post')
+@patch('requests.Session.post')
 def test_forward_to_api_logging(mock_post):
     log_capture = get_request().getfixturevalue('caplog')
     mock_response = Mock()
@@ -114,3 +132,71 @@ def test_forward_to_api_logging(mock_post):
 
     debug_records = [r for r in log_capture.records if r.levelname == 'DEBUG']
     assert len(debug_records) >= 2  # Request and response should be logged
+
+
+@patch('requests.Session.post')
+def test_forward_to_api_skips_response_body_unless_debug(mock_post):
+    log_capture = get_request().getfixturevalue('caplog')
+    # Accessing mock_response.text would raise AttributeError
+    mock_response = Mock(spec=['status_code', 'raise_for_status'])
+    mock_response.status_code = 200
+    mock_post.return_value = mock_response
+
+    with log_capture.at_level(logging.INFO):
+        forward_to_api('https://example.com/api', {'test': 'data'}, None)
+
+    assert 'API Response - Status: 200' in log_capture.messages
+
+
+@patch('requests.Session.post')
+def test_forward_to_api_streams_iterator(mock_post):
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.text = '{"success": true}'
+    mock_post.return_value = mock_response
+
+    payload = iter_rows_json([{'test': 'data1'}, {'test': 'data2'}])
+    forward_to_api('https://example.com/api', payload, ('user', 'pass'))
+
+    mock_post.assert_called_once_with(
+        'https://example.com/api',
+        data=payload,
+        auth=('user', 'pass'),
+        headers={'Content-Type': 'application/json'},
+        timeout=(5, 300),
+    )
+
+
+@patch('requests.Session.post')
+def test_forward_to_api_logs_streamed_payload_placeholder(mock_post):
+    log_capture = get_request().getfixturevalue('caplog')
+    mock_post.return_value = Mock(status_code=200, text='')
+
+    payload = iter_rows_json([{'test': 'data'}])
+    with log_capture.at_level(logging.DEBUG):
+        forward_to_api('https://example.com/api', payload, None)
+
+    assert (
+        'API Request - URL: https://example.com/api, Payload: <streamed batch>'
+    ) in log_capture.messages
+
+
+@patch('requests.Session.post')
+def test_forward_to_api_logs_bytes_payload_decoded(mock_post):
+    log_capture = get_request().getfixturevalue('caplog')
+    mock_post.return_value = Mock(status_code=200, text='')
+
+    with log_capture.at_level(logging.DEBUG):
+        forward_to_api('https://example.com/api', b'{"test":"data"}', None)
+
+    assert (
+        'API Request - URL: https://example.com/api, Payload: {"test":"data"}'
+    ) in log_capture.messages
+
+
+def test_iter_rows_json_serializes_unsupported_types():
+    rows = [{'amount': Decimal('1.50'), 'date': date(2024, 1, 31)}]
+
+    payload = json.loads(b''.join(iter_rows_json(rows)))
+
+    assert payload == {'rows': [{'amount': '1.50', 'date': '2024-01-31'}]}
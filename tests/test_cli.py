@@ -1,55 +1,110 @@
 """Tests for CLI interface."""
 
+import json
+import logging
+import re
+import subprocess
+import sys
+from pathlib import Path
+
 import pytest
-from unittest.mock import patch, Mock
+from unittest.mock import DEFAULT, patch, Mock
+from unmagic import fixture, get_request
 
 from db_fwd import parse_args, main
 
 
-def test_parse_args_minimal():
-    with patch('sys.argv', ['db_fwd.py', 'query_name']):
-        args = parse_args()
-        assert args.query_name == 'query_name'
-        assert args.query_params == []
-        assert args.log_level is None
-        assert args.log_file is None
-        assert args.config_file == 'db_fwd.toml'
-
-
-def test_parse_args_with_params():
-    with patch('sys.argv', ['db_fwd.py', 'query_name', 'param1', 'param2']):
-        args = parse_args()
-        assert args.query_name == 'query_name'
-        assert args.query_params == ['param1', 'param2']
-
+def set_argv(*args):
+    monkeypatch = get_request().getfixturevalue('monkeypatch')
+    monkeypatch.setattr(sys, 'argv', ['db_fwd.py', *args])
+
+
+CONFIG_RETURN_VALUES = {
+    'get_log_level': 'info',
+    'get_log_file': 'test.log',
+    'get_log_db_url': None,
+    'get_db_url': 'postgresql://localhost/test',
+    'get_query': 'SELECT data FROM test;',
+    'get_api_url': 'https://example.com/api',
+    'get_api_credentials': ('user', 'pass'),
+    'get_batch': False,
+}
+
+
+def config_mock(**return_values):
+    # A shallow copy of a configured Mock shares its child mocks, so
+    # overriding a return value would leak into other tests. Build a
+    # fresh Mock from a plain dict instead.
+    return_values = CONFIG_RETURN_VALUES | return_values
+    return Mock(
+        **{
+            f'{name}.return_value': value
+            for name, value in return_values.items()
+        }
+    )
+
+
+@fixture
+def main_mocks():
+    with patch.multiple(
+        'db_fwd',
+        Config=DEFAULT,
+        set_up_logging=DEFAULT,
+        execute_query=DEFAULT,
+        forward_to_api=DEFAULT,
+    ) as mocks:
+        mocks['Config'].return_value = config_mock()
+        yield mocks
+
+
+def test_import_does_not_load_sqlalchemy_or_requests():
+    code = (
+        'import sys, db_fwd; '
+        'print(sorted({"sqlalchemy", "requests"} & set(sys.modules)))'
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.strip() == '[]'
 
-def test_parse_args_with_log_level():
-    with patch(
-        'sys.argv', ['db_fwd.py', '--log-level', 'debug', 'query_name']
-    ):
-        args = parse_args()
-        assert args.log_level == 'debug'
 
-
-def test_parse_args_with_log_file():
-    with patch(
-        'sys.argv', ['db_fwd.py', '--log-file', 'custom.log', 'query_name']
-    ):
-        args = parse_args()
-        assert args.log_file == 'custom.log'
+def test_parse_args_minimal():
+    set_argv('query_name')
+    args = parse_args()
+    assert args.query_name == 'query_name'
+    assert args.query_params == []
+    assert args.log_level is None
+    assert args.log_file is None
+    assert args.config_file == 'db_fwd.toml'
 
 
-def test_parse_args_with_config_file():
-    with patch(
-        'sys.argv', ['db_fwd.py', '--config-file', 'custom.toml', 'query_name']
-    ):
-        args = parse_args()
-        assert args.config_file == 'custom.toml'
+def test_parse_args_with_params():
+    set_argv('query_name', 'param1', 'param2')
+    args = parse_args()
+    assert args.query_name == 'query_name'
+    assert args.query_params == ['param1', 'param2']
+
+
+@pytest.mark.parametrize(
+    'flag, attr, value',
+    [
+        ('--log-level', 'log_level', 'debug'),
+        ('--log-file', 'log_file', 'custom.log'),
+        ('--config-file', 'config_file', 'custom.toml'),
+    ],
+)
+def test_parse_args_single_option(flag, attr, value):
+    set_argv(flag, value, 'query_name')
+    args = parse_args()
+    assert getattr(args, attr) == value
 
 
 def test_parse_args_all_options():
     test_argv = [
-        'db_fwd.py',
         '--log-level',
         'info',
         '--log-file',
@@ -61,174 +116,123 @@ def test_parse_args_all_options():
         'param2',
     ]
 
-    with patch('sys.argv', test_argv):
-        args = parse_args()
-        assert args.log_level == 'info'
-        assert args.log_file == 'test.log'
-        assert args.config_file == 'test.toml'
-        assert args.query_name == 'my_query'
-        assert args.query_params == ['param1', 'param2']
-
-
-@patch('db_fwd.forward_to_api')
-@patch('db_fwd.execute_query')
-@patch('db_fwd.set_up_logging')
-@patch('db_fwd.Config')
-def test_main_success(
-    mock_config_class,
-    mock_setup_logging,
-    mock_execute_query,
-    mock_forward_to_api,
-):
-    mock_config = Mock()
-    mock_config.get_log_level.return_value = 'info'
-    mock_config.get_log_file.return_value = 'test.log'
-    mock_config.get_log_db_url.return_value = None
-    mock_config.get_db_url.return_value = 'postgresql://localhost/test'
-    mock_config.get_query.return_value = 'SELECT data FROM test;'
-    mock_config.get_api_url.return_value = 'https://example.com/api'
-    mock_config.get_api_credentials.return_value = ('user', 'pass')
-    mock_config_class.return_value = mock_config
-
-    mock_execute_query.return_value = '{"test": "data"}'
-
-    with patch('sys.argv', ['db_fwd.py', 'test_query']):
+    set_argv(*test_argv)
+    args = parse_args()
+    assert args.log_level == 'info'
+    assert args.log_file == 'test.log'
+    assert args.config_file == 'test.toml'
+    assert args.query_name == 'my_query'
+    assert args.query_params == ['param1', 'param2']
+
+
+def test_main_success():
+    mocks = main_mocks()
+
+    mocks['execute_query'].return_value = '{"test": "data"}'
+
+    set_argv('test_query')
+    main()
+
+    mocks['Config'].assert_called_once_with('db_fwd.toml')
+    mocks['set_up_logging'].assert_called_once_with('info', 'test.log', None)
+    mocks['execute_query'].assert_called_once()
+    mocks['forward_to_api'].assert_called_once()
+
+
+def test_main_logs_one_summary():
+    mocks = main_mocks()
+    log_capture = get_request().getfixturevalue('caplog')
+
+    mocks['execute_query'].return_value = '{"test": "data"}'
+
+    set_argv('test_query')
+    with log_capture.at_level(logging.INFO):
         main()
 
-    mock_config_class.assert_called_once_with('db_fwd.toml')
-    mock_setup_logging.assert_called_once_with('info', 'test.log', None)
-    mock_execute_query.assert_called_once()
-    mock_forward_to_api.assert_called_once()
-
-
-@patch('db_fwd.Config')
-def test_main_config_file_not_found(mock_config_class):
-    mock_config_class.side_effect = FileNotFoundError('Config not found')
-
-    with patch('sys.argv', ['db_fwd.py', 'test_query']):
-        with pytest.raises(SystemExit) as exc_info:
-            main()
-        assert exc_info.value.code == 1
-
-
-@patch('db_fwd.execute_query')
-@patch('db_fwd.set_up_logging')
-@patch('db_fwd.Config')
-def test_main_query_error(
-    mock_config_class,
-    mock_setup_logging,
-    mock_execute_query,
-):
-    mock_config = Mock()
-    mock_config.get_log_level.return_value = 'info'
-    mock_config.get_log_file.return_value = 'test.log'
-    mock_config.get_log_db_url.return_value = None
-    mock_config.get_db_url.return_value = 'postgresql://localhost/test'
-    mock_config.get_query.return_value = 'SELECT data FROM test;'
-    mock_config.get_api_url.return_value = 'https://example.com/api'
-    mock_config.get_api_credentials.return_value = ('user', 'pass')
-    mock_config_class.return_value = mock_config
-
-    mock_execute_query.side_effect = ValueError('Query failed')
-
-    with patch('sys.argv', ['db_fwd.py', 'test_query']):
-        with pytest.raises(SystemExit) as exc_info:
-            main()
-        assert exc_info.value.code == 1
-
-
-@patch('db_fwd.forward_to_api')
-@patch('db_fwd.execute_query')
-@patch('db_fwd.set_up_logging')
-@patch('db_fwd.Config')
-def test_main_api_error(
-    mock_config_class,
-    mock_setup_logging,
-    mock_execute_query,
-    mock_forward_to_api,
-):
-    mock_config = Mock()
-    mock_config.get_log_level.return_value = 'info'
-    mock_config.get_log_file.return_value = 'test.log'
-    mock_config.get_log_db_url.return_value = None
-    mock_config.get_db_url.return_value = 'postgresql://localhost/test'
-    mock_config.get_query.return_value = 'SELECT data FROM test;'
-    mock_config.get_api_url.return_value = 'https://example.com/api'
-    mock_config.get_api_credentials.return_value = ('user', 'pass')
-    mock_config_class.return_value = mock_config
-
-    mock_execute_query.return_value = '{"test": "data"}'
-    mock_forward_to_api.side_effect = Exception('API failed')
-
-    with patch('sys.argv', ['db_fwd.py', 'test_query']):
-        with pytest.raises(SystemExit) as exc_info:
-            main()
-        assert exc_info.value.code == 1
-
-
-@patch('db_fwd.forward_to_api')
-@patch('db_fwd.execute_query')
-@patch('db_fwd.set_up_logging')
-@patch('db_fwd.Config')
-def test_main_with_query_params(
-    mock_config_class,
-    mock_setup_logging,
-    mock_execute_query,
-    mock_forward_to_api,
-):
-    mock_config = Mock()
-    mock_config.get_log_level.return_value = 'info'
-    mock_config.get_log_file.return_value = 'test.log'
-    mock_config.get_log_db_url.return_value = None
-    mock_config.get_db_url.return_value = 'postgresql://localhost/test'
-    mock_config.get_query.return_value = 'SELECT data WHERE period = :param1;'
-    mock_config.get_api_url.return_value = 'https://example.com/api'
-    mock_config.get_api_credentials.return_value = ('user', 'pass')
-    mock_config_class.return_value = mock_config
-
-    mock_execute_query.return_value = '{"test": "data"}'
-
-    with patch('sys.argv', ['db_fwd.py', 'test_query', '2024Q1']):
+    assert len(log_capture.records) == 1
+    assert re.fullmatch(
+        r'Completed query test_query in \d+ ms', log_capture.messages[0]
+    )
+
+
+def test_main_config_file_not_found():
+    mocks = main_mocks()
+    mocks['Config'].side_effect = FileNotFoundError('Config not found')
+
+    set_argv('test_query')
+    with pytest.raises(SystemExit) as exc_info:
         main()
+    assert exc_info.value.code == 1
 
-    mock_execute_query.assert_called_once()
-    call_args = mock_execute_query.call_args[0]
-    assert call_args[2] == ['2024Q1']  # params argument
 
+def test_main_query_error():
+    mocks = main_mocks()
 
-@patch('db_fwd.forward_to_api')
-@patch('db_fwd.execute_query')
-@patch('db_fwd.set_up_logging')
-@patch('db_fwd.Config')
-def test_main_with_cli_overrides(
-    mock_config_class,
-    mock_setup_logging,
-    mock_execute_query,
-    mock_forward_to_api,
-):
-    mock_config = Mock()
-    mock_config.get_log_level.return_value = 'info'
-    mock_config.get_log_file.return_value = 'default.log'
-    mock_config.get_log_db_url.return_value = None
-    mock_config.get_db_url.return_value = 'postgresql://localhost/test'
-    mock_config.get_query.return_value = 'SELECT data FROM test;'
-    mock_config.get_api_url.return_value = 'https://example.com/api'
-    mock_config.get_api_credentials.return_value = ('user', 'pass')
-    mock_config_class.return_value = mock_config
-
-    mock_execute_query.return_value = '{"test": "data"}'
-
-    with patch(
-        'sys.argv',
-        [
-            'db_fwd.py',
-            '--log-level',
-            'debug',
-            '--log-file',
-            'custom.log',
-            'test_query',
-        ],
-    ):
+    mocks['execute_query'].side_effect = ValueError('Query failed')
+
+    set_argv('test_query')
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 1
+
+
+def test_main_api_error():
+    mocks = main_mocks()
+
+    mocks['execute_query'].return_value = '{"test": "data"}'
+    mocks['forward_to_api'].side_effect = Exception('API failed')
+
+    set_argv('test_query')
+    with pytest.raises(SystemExit) as exc_info:
         main()
+    assert exc_info.value.code == 1
+
+
+def test_main_with_query_params():
+    mocks = main_mocks()
+    mocks['Config'].return_value = config_mock(
+        get_query='SELECT data WHERE period = :param1;'
+    )
+
+    mocks['execute_query'].return_value = '{"test": "data"}'
+
+    set_argv('test_query', '2024Q1')
+    main()
+
+    mocks['execute_query'].assert_called_once()
+    call_args = mocks['execute_query'].call_args[0]
+    assert call_args[2] == ['2024Q1']  # params argument
+
+
+def test_main_batch():
+    mocks = main_mocks()
+    mocks['Config'].return_value = config_mock(
+        get_query='SELECT id, data FROM test;', get_batch=True
+    )
+
+    rows = [{'id': 1, 'data': 'a'}, {'id': 2, 'data': 'b'}]
+    mocks['execute_query'].return_value = rows
+
+    set_argv('test_query')
+    main()
+
+    assert mocks['execute_query'].call_args[0][3] is True
+    mocks['forward_to_api'].assert_called_once()
+    api_url, payload, creds = mocks['forward_to_api'].call_args[0]
+    assert api_url == 'https://example.com/api'
+    assert json.loads(b''.join(payload)) == {'rows': rows}
+    assert creds == ('user', 'pass')
+
+
+def test_main_with_cli_overrides():
+    mocks = main_mocks()
+    mocks['Config'].return_value = config_mock(get_log_file='default.log')
+
+    mocks['execute_query'].return_value = '{"test": "data"}'
+
+    set_argv('--log-level', 'debug', '--log-file', 'custom.log', 'test_query')
+    main()
 
-    mock_setup_logging.assert_called_once_with('debug', 'custom.log', None)
+    mocks['set_up_logging'].assert_called_once_with(
+        'debug', 'custom.log', None
+    )
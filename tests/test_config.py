@@ -1,16 +1,33 @@
 """Tests for configuration management."""
 
-import os
 import tempfile
 from pathlib import Path
+from unittest.mock import patch
+from uuid import uuid4
 
 import pytest
-from unmagic import fixture
+from unmagic import fixture, get_request
 
 from db_fwd import Config
 
 
-@fixture
+@fixture(scope='session')
+def config_dir():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield Path(tmpdir)
+
+
+def write_config(content):
+    path = config_dir() / f'{uuid4().hex}.toml'
+    path.write_text(content)
+    return str(path)
+
+
+def make_config(content):
+    return Config(write_config(content))
+
+
+@fixture(scope='session')
 def sample_config_file():
     config_content = """
 [db_fwd]
@@ -36,18 +53,13 @@ api_password = 'other_pass'
 
 [queries.minimal_query]
 query = "SELECT result FROM minimal;"
-"""
 
-    with tempfile.NamedTemporaryFile(
-        mode='w', suffix='.toml', delete=False
-    ) as f:
-        f.write(config_content)
-        temp_path = f.name
+[queries.batch_query]
+query = "SELECT id, result FROM batch;"
+batch = true
+"""
 
-    try:
-        yield temp_path
-    finally:
-        Path(temp_path).unlink()
+    yield write_config(config_content)
 
 
 def test_config_load_success():
@@ -58,6 +70,25 @@ def test_config_load_success():
     assert 'queries' in config.config
 
 
+def test_config_parses_unchanged_file_once():
+    config_file = sample_config_file()
+    Config(config_file)
+
+    with patch('db_fwd.load_toml') as mock_load_toml:
+        config = Config(config_file)
+
+    mock_load_toml.assert_not_called()
+    assert config.get_log_level() == 'debug'
+
+
+def test_config_reloads_changed_file():
+    config_file = write_config("[db_fwd]\nlog_level = 'info'\n")
+    assert Config(config_file).get_log_level() == 'info'
+
+    Path(config_file).write_text("[db_fwd]\nlog_level = 'debug'\n")
+    assert Config(config_file).get_log_level() == 'debug'
+
+
 def test_config_file_not_found():
     with pytest.raises(FileNotFoundError):
         Config('nonexistent.toml')
@@ -72,17 +103,8 @@ def test_get_log_level():
 def test_get_log_level_default():
     config_content = '[db_fwd]\n'
 
-    with tempfile.NamedTemporaryFile(
-        mode='w', suffix='.toml', delete=False
-    ) as f:
-        f.write(config_content)
-        temp_path = f.name
-
-    try:
-        config = Config(temp_path)
-        assert config.get_log_level() == 'info'
-    finally:
-        Path(temp_path).unlink()
+    config = make_config(config_content)
+    assert config.get_log_level() == 'info'
 
 
 def test_get_log_file():
@@ -94,17 +116,8 @@ def test_get_log_file():
 def test_get_log_file_default():
     config_content = '[db_fwd]\n'
 
-    with tempfile.NamedTemporaryFile(
-        mode='w', suffix='.toml', delete=False
-    ) as f:
-        f.write(config_content)
-        temp_path = f.name
-
-    try:
-        config = Config(temp_path)
-        assert config.get_log_file() == 'db_fwd.log'
-    finally:
-        Path(temp_path).unlink()
+    config = make_config(config_content)
+    assert config.get_log_file() == 'db_fwd.log'
 
 
 def test_get_log_db_url():
@@ -136,20 +149,10 @@ query = "SELECT 1;"
 api_url = "https://example.com/api"
 """
 
-    with tempfile.NamedTemporaryFile(
-        mode='w', suffix='.toml', delete=False
-    ) as f:
-        f.write(config_content)
-        temp_path = f.name
-
-    try:
-        os.environ['DB_FWD_DB_URL'] = 'postgresql://env/db'
-        config = Config(temp_path)
-        assert config.get_db_url('test') == 'postgresql://env/db'
-    finally:
-        Path(temp_path).unlink()
-        if 'DB_FWD_DB_URL' in os.environ:
-            del os.environ['DB_FWD_DB_URL']
+    monkeypatch = get_request().getfixturevalue('monkeypatch')
+    monkeypatch.setenv('DB_FWD_DB_URL', 'postgresql://env/db')
+    config = make_config(config_content)
+    assert config.get_db_url('test') == 'postgresql://env/db'
 
 
 def test_get_db_url_missing():
@@ -160,18 +163,9 @@ def test_get_db_url_missing():
 query = "SELECT 1;"
 """
 
-    with tempfile.NamedTemporaryFile(
-        mode='w', suffix='.toml', delete=False
-    ) as f:
-        f.write(config_content)
-        temp_path = f.name
-
-    try:
-        config = Config(temp_path)
-        with pytest.raises(ValueError, match='Database URL not configured'):
-            config.get_db_url('test')
-    finally:
-        Path(temp_path).unlink()
+    config = make_config(config_content)
+    with pytest.raises(ValueError, match='Database URL not configured'):
+        config.get_db_url('test')
 
 
 def test_get_query():
@@ -188,6 +182,13 @@ def test_get_query_not_found():
         config.get_query('nonexistent')
 
 
+def test_get_query_section_setting_is_not_a_query():
+    config_file = sample_config_file()
+    config = Config(config_file)
+    with pytest.raises(ValueError, match="Query 'db_url' not found"):
+        config.get_query('db_url')
+
+
 def test_get_query_no_sql():
     config_content = """
 [queries]
@@ -196,18 +197,9 @@ def test_get_query_no_sql():
 api_url = "https://example.com/api"
 """
 
-    with tempfile.NamedTemporaryFile(
-        mode='w', suffix='.toml', delete=False
-    ) as f:
-        f.write(config_content)
-        temp_path = f.name
-
-    try:
-        config = Config(temp_path)
-        with pytest.raises(ValueError, match='No query defined'):
-            config.get_query('bad_query')
-    finally:
-        Path(temp_path).unlink()
+    config = make_config(config_content)
+    with pytest.raises(ValueError, match='No query defined'):
+        config.get_query('bad_query')
 
 
 def test_get_api_url_query_specific():
@@ -233,18 +225,21 @@ def test_get_api_url_missing():
 query = "SELECT 1;"
 """
 
-    with tempfile.NamedTemporaryFile(
-        mode='w', suffix='.toml', delete=False
-    ) as f:
-        f.write(config_content)
-        temp_path = f.name
+    config = make_config(config_content)
+    with pytest.raises(ValueError, match='API URL not configured'):
+        config.get_api_url('test')
+
+
+def test_get_batch():
+    config_file = sample_config_file()
+    config = Config(config_file)
+    assert config.get_batch('batch_query') is True
+
 
-    try:
-        config = Config(temp_path)
-        with pytest.raises(ValueError, match='API URL not configured'):
-            config.get_api_url('test')
-    finally:
-        Path(temp_path).unlink()
+def test_get_batch_default():
+    config_file = sample_config_file()
+    config = Config(config_file)
+    assert config.get_batch('test_query') is False
 
 
 def test_get_api_credentials_from_queries():
@@ -261,6 +256,13 @@ def test_get_api_credentials_query_specific():
     assert creds == ('other_user', 'other_pass')
 
 
+def test_get_api_credentials_without_query_name():
+    config_file = sample_config_file()
+    config = Config(config_file)
+    creds = config.get_api_credentials()
+    assert creds == ('test_user', 'test_pass')
+
+
 def test_get_api_credentials_from_env():
     config_content = """
 [queries]
@@ -270,24 +272,29 @@ query = "SELECT 1;"
 api_url = "https://example.com/api"
 """
 
-    with tempfile.NamedTemporaryFile(
-        mode='w', suffix='.toml', delete=False
-    ) as f:
-        f.write(config_content)
-        temp_path = f.name
-
-    try:
-        os.environ['DB_FWD_API_USERNAME'] = 'env_user'
-        os.environ['DB_FWD_API_PASSWORD'] = 'env_pass'
-        config = Config(temp_path)
-        creds = config.get_api_credentials('test')
-        assert creds == ('env_user', 'env_pass')
-    finally:
-        Path(temp_path).unlink()
-        if 'DB_FWD_API_USERNAME' in os.environ:
-            del os.environ['DB_FWD_API_USERNAME']
-        if 'DB_FWD_API_PASSWORD' in os.environ:
-            del os.environ['DB_FWD_API_PASSWORD']
+    monkeypatch = get_request().getfixturevalue('monkeypatch')
+    monkeypatch.setenv('DB_FWD_API_USERNAME', 'env_user')
+    monkeypatch.setenv('DB_FWD_API_PASSWORD', 'env_pass')
+    config = make_config(config_content)
+    creds = config.get_api_credentials('test')
+    assert creds == ('env_user', 'env_pass')
+
+
+def test_get_api_credentials_from_env_set_after_loading():
+    config_content = """
+[queries]
+
+[queries.test]
+query = "SELECT 1;"
+api_url = "https://example.com/api"
+"""
+
+    config = make_config(config_content)
+    monkeypatch = get_request().getfixturevalue('monkeypatch')
+    monkeypatch.setenv('DB_FWD_API_USERNAME', 'env_user')
+    monkeypatch.setenv('DB_FWD_API_PASSWORD', 'env_pass')
+    creds = config.get_api_credentials('test')
+    assert creds == ('env_user', 'env_pass')
 
 
 def test_get_api_credentials_none():
@@ -299,15 +306,6 @@ query = "SELECT 1;"
 api_url = "https://example.com/api"
 """
 
-    with tempfile.NamedTemporaryFile(
-        mode='w', suffix='.toml', delete=False
-    ) as f:
-        f.write(config_content)
-        temp_path = f.name
-
-    try:
-        config = Config(temp_path)
-        creds = config.get_api_credentials('test')
-        assert creds is None
-    finally:
-        Path(temp_path).unlink()
+    config = make_config(config_content)
+    creds = config.get_api_credentials('test')
+    assert creds is None
@@ -3,117 +3,211 @@
 import logging
 import re
 import tempfile
+from logging.handlers import QueueHandler
 from pathlib import Path
+from unittest.mock import patch
+from uuid import uuid4
 
 import pytest
+from unmagic import fixture
 
-from db_fwd import set_up_logging
+from db_fwd import _close_handlers, set_up_logging
 
 
-def test_setup_logging_info_level():
+@fixture(scope='module')
+def log_dir():
     with tempfile.TemporaryDirectory() as tmpdir:
-        log_file = Path(tmpdir) / 'test.log'
+        yield Path(tmpdir)
 
-        set_up_logging('info', str(log_file), None)
 
-        logging.info('Test info message')
+def new_log_file():
+    return log_dir() / f'{uuid4().hex}.log'
+
+
+def test_setup_logging_info_level():
+    log_file = new_log_file()
+
+    set_up_logging('info', str(log_file), None)
+
+    logging.info('Test info message')
 
-        # Close all handlers to ensure messages are written
-        for handler in logging.root.handlers[:]:
-            handler.close()
-            logging.root.removeHandler(handler)
+    # Close all handlers to ensure messages are written
+    _close_handlers(logging.root)
 
-        with open(log_file, 'r') as f:
-            content = f.read()
+    with open(log_file, 'r') as f:
+        content = f.read()
 
-        assert 'Test info message' in content
-        assert 'INFO' in content
+    assert 'Test info message' in content
+    assert 'INFO' in content
 
 
 def test_setup_logging_debug_level():
-    with tempfile.TemporaryDirectory() as tmpdir:
-        log_file = Path(tmpdir) / 'test.log'
+    log_file = new_log_file()
 
-        set_up_logging('debug', str(log_file), None)
+    set_up_logging('debug', str(log_file), None)
 
-        logging.debug('Test debug message')
-        logging.info('Test info message')
+    logging.debug('Test debug message')
+    logging.info('Test info message')
 
-        # Close all handlers to ensure messages are written
-        for handler in logging.root.handlers[:]:
-            handler.close()
-            logging.root.removeHandler(handler)
+    # Close all handlers to ensure messages are written
+    _close_handlers(logging.root)
 
-        with open(log_file, 'r') as f:
-            content = f.read()
+    with open(log_file, 'r') as f:
+        content = f.read()
 
-        assert 'Test debug message' in content
-        assert 'DEBUG' in content
-        assert 'Test info message' in content
+    assert 'Test debug message' in content
+    assert 'DEBUG' in content
+    assert 'Test info message' in content
 
 
 def test_setup_logging_none_level():
-    with tempfile.NamedTemporaryFile(
-        mode='w', suffix='.log', delete=False
-    ) as f:
-        log_file = f.name
+    log_file = new_log_file()
 
     try:
-        set_up_logging('none', log_file, None)
+        set_up_logging('none', str(log_file), None)
 
         logging.critical('Test critical message')
         logging.error('Test error message')
         logging.info('Test info message')
 
-        with open(log_file, 'r') as f:
-            content = f.read()
-
-        assert 'Test info message' not in content
-        assert 'Test error message' not in content
+        assert not log_file.exists()
     finally:
-        Path(log_file).unlink()
-        for handler in logging.root.handlers[:]:
-            logging.root.removeHandler(handler)
+        logging.disable(logging.NOTSET)
+        _close_handlers(logging.root)
+
+
+def test_setup_logging_after_none_level():
+    log_file = new_log_file()
+
+    set_up_logging('none', str(log_file), None)
+    set_up_logging('info', str(log_file), None)
+
+    logging.info('Test info message')
+    _close_handlers(logging.root)
+
+    assert 'Test info message' in log_file.read_text()
 
 
 def test_setup_logging_creates_file():
-    with tempfile.TemporaryDirectory() as tmpdir:
-        log_file = Path(tmpdir) / 'new_log.log'
-        assert not log_file.exists()
+    log_file = new_log_file()
+    assert not log_file.exists()
+
+    set_up_logging('info', str(log_file), None)
+
+    logging.info('Test message')
+
+    assert log_file.exists()
+
+    _close_handlers(logging.root)
+
+
+def test_setup_logging_no_file_without_records():
+    log_file = new_log_file()
+
+    set_up_logging('info', str(log_file), None)
+
+    logging.debug('Test debug message')
+
+    _close_handlers(logging.root)
+
+    assert not log_file.exists()
 
-        set_up_logging('info', str(log_file), None)
 
-        logging.info('Test message')
+def test_setup_logging_writes_buffered_records_on_close():
+    log_file = new_log_file()
 
-        assert log_file.exists()
+    set_up_logging('info', str(log_file), None)
 
-        for handler in logging.root.handlers[:]:
-            logging.root.removeHandler(handler)
+    logging.info('Test message')
+
+    assert log_file.read_text() == ''
+
+    _close_handlers(logging.root)
+
+    assert 'Test message' in log_file.read_text()
 
 
 def test_setup_logging_format():
-    with tempfile.TemporaryDirectory() as tmpdir:
-        log_file = Path(tmpdir) / 'test.log'
+    log_file = new_log_file()
 
-        set_up_logging('info', str(log_file), None)
+    set_up_logging('info', str(log_file), None)
 
-        logging.info('Test message')
+    logging.info('Test message')
 
-        # Close all handlers to ensure messages are written
-        for handler in logging.root.handlers[:]:
-            handler.close()
-            logging.root.removeHandler(handler)
+    # Close all handlers to ensure messages are written
+    _close_handlers(logging.root)
 
-        with open(log_file, 'r') as f:
-            content = f.read()
+    with open(log_file, 'r') as f:
+        content = f.read()
 
-        assert ' - INFO - Test message' in content
-        assert re.search(r'\d{4}-\d{2}-\d{2}', content)
+    assert ' - INFO - Test message' in content
+    assert re.search(r'\d{4}-\d{2}-\d{2}', content)
 
 
 def test_setup_logging_invalid_level():
-    with tempfile.TemporaryDirectory() as tmpdir:
-        log_file = Path(tmpdir) / 'test.log'
+    log_file = new_log_file()
+
+    with pytest.raises(ValueError, match="Invalid log level 'invalid'"):
+        set_up_logging('invalid', str(log_file), None)
+
+
+@patch('db_fwd.DatabaseHandler')
+def test_setup_logging_database_handler_uses_queue(mock_handler_class):
+    db_handler = mock_handler_class.return_value
+    db_handler.level = logging.NOTSET
+
+    log_file = new_log_file()
+
+    set_up_logging('info', str(log_file), 'postgresql://localhost/logs')
+
+    logging.info('Test message')
+
+    queue_handlers = [
+        h for h in logging.root.handlers if isinstance(h, QueueHandler)
+    ]
+    assert len(queue_handlers) == 1
+    listener = queue_handlers[0].listener
+    assert listener is not None
+    listener.stop()
+
+    _close_handlers(logging.root)
+
+    mock_handler_class.assert_called_once_with('postgresql://localhost/logs')
+    db_handler.handle.assert_called_once()
+    record = db_handler.handle.call_args[0][0]
+    assert record.getMessage() == 'Test message'
+
+
+@patch('db_fwd.DatabaseHandler')
+def test_setup_logging_database_handler_level(mock_handler_class):
+    db_handler = mock_handler_class.return_value
+    db_handler.level = logging.NOTSET
+
+    log_file = new_log_file()
+
+    set_up_logging('info', str(log_file), 'postgresql://localhost/logs')
+
+    logging.debug('Test debug message')
+
+    _close_handlers(logging.root)
+
+    db_handler.handle.assert_not_called()
+
+
+def test_setup_logging_replaces_previous_handlers():
+    first_log_file = new_log_file()
+    second_log_file = new_log_file()
+
+    set_up_logging('info', str(first_log_file), None)
+    logging.info('First message')
+
+    set_up_logging('info', str(second_log_file), None)
+    logging.info('Second message')
+
+    assert len(logging.root.handlers) == 1
+    # The first handler was closed, which wrote its buffered record
+    assert first_log_file.read_text().endswith(' - First message\n')
+
+    _close_handlers(logging.root)
 
-        with pytest.raises(ValueError, match="Invalid log level 'invalid'"):
-            set_up_logging('invalid', str(log_file), None)
+    assert 'First message' not in second_log_file.read_text()